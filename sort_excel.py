@@ -1,252 +1,449 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-sort_excel.py (improved)
-- Excelの「受諾確認票」シートを読み込み、3種類のシートを生成
-  1) 融資実行日でソート
-  2) 金消日・面談日でソート
-  3) 上記を統合し、日付ごとの個別シートも自動作成
-- 「日付シート」では、以下の優先順位で並べ替え
-   (1) 識別: 降順
-   (2) 担当: 指定の順序（未リスト名は最後）
-   (3) 時間: 昇順
-- 罫線/高さ/配置/幅/縮小表示など表の書式を自動設定
-- PyInstallerでexe化できるよう、余計な依存を避けた実装
-"""
-
-import sys
-from pathlib import Path
-import pandas as pd
-import numpy as np
-
-# ====== 設定 ======
-担当順 = ["河内", "岩川", "杉田", "正木", "吉田", "中谷", "椙村", "北条", "上野"]
-
-# Excelの列見出し（標準化後）
-COLS_LOAN   = ['融資実行日','形態','お客様氏名','物件','依頼内容','担当','管轄','立会時間','立会場所','立会者','当日申請']
-COLS_CANCEL = ['金消日・面談日','形態','お客様氏名','物件','依頼内容','担当','管轄','金消時間','金消場所・面談場所','意思確認','融資実行日']
-
-COLS_OUT_ORDER = ['日付','形態','お客様氏名','物件','依頼内容','担当','管轄','時間','場所','確認者','申請','識別']
-
-# 書式設定（列幅はだいたいのピクセル→Excel幅換算（約 1単位≒7px））
-PX = lambda p: round(p/7.0, 2)
-WIDTH_RULES = {
-    'お客様氏名': PX(115),
-    '物件': PX(160),
-    '場所': PX(160),
-    # その他は 80px
-}
-DEFAULT_WIDTH = PX(80)
-
-ROW_HEIGHT = 25  # pt ではなく「行の高さ」単位（ExcelのUI上）
-# ==================
-
-import ctypes
-
-def _show_msg(title: str, text: str, style: int = 0):
-    try:
-        ctypes.windll.user32.MessageBoxW(0, text, title, style)
-    except Exception:
-        print(f"[{title}] {text}")
-
-def _read_sheet(path: Path) -> pd.DataFrame:
-    excel_file = pd.ExcelFile(path)
-    sheets = excel_file.sheet_names
-
-    target_sheet = None
-    candidates = ['受諾確認票', 'Sheet1', 'シート1']
-    for candidate in candidates:
-        if candidate in sheets:
-            target_sheet = candidate
-            break
-
-    if target_sheet is None and len(sheets) > 0:
-        target_sheet = sheets[0]
-
-    df = pd.read_excel(excel_file, sheet_name=target_sheet)
-    df.columns = df.columns.astype(str).str.strip()
-    # 日付系
-    for c in ['融資実行日','金消日・面談日']:
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors='coerce')
-    return df
-
-def _dt_to_str(s: pd.Series) -> pd.Series:
-    # NaTはそのまま
-    return s.dt.strftime('%Y/%m/%d')
-
-def _make_tables(df: pd.DataFrame):
-    # (1) 融資実行日でソート
-    loan = df.copy()
-    loan = loan.sort_values(by='融資実行日')
-    loan = loan.assign(
-        識別 = '融資実行日'
-    )
-    loan = loan.rename(columns={'融資実行日':'日付','立会時間':'時間','立会場所':'場所','立会者':'確認者','当日申請':'申請'})
-    # 列整列
-    loan = loan[[c for c in COLS_OUT_ORDER if c in loan.columns]]
-    # 日付文字列化
-    if '日付' in loan.columns:
-        loan['日付'] = pd.to_datetime(loan['日付'], errors='coerce')
-        loan['日付'] = _dt_to_str(loan['日付'])
-
-    # (2) 金消日・面談日でソート
-    cancel = df.copy()
-    cancel = cancel.sort_values(by='金消日・面談日')
-    cancel = cancel.assign(
-        識別 = '金消日・面談日'
-    )
-    cancel = cancel.rename(columns={'金消日・面談日':'日付','金消時間':'時間','金消場所・面談場所':'場所','意思確認':'確認者','融資実行日':'申請'})
-    cancel = cancel[[c for c in COLS_OUT_ORDER if c in cancel.columns]]
-    if '日付' in cancel.columns:
-        cancel['日付'] = pd.to_datetime(cancel['日付'], errors='coerce')
-        cancel['日付'] = _dt_to_str(cancel['日付'])
-
-    # (3) 統合 + 「日付」昇順
-    combined = pd.concat([loan, cancel], ignore_index=True, sort=False)
-    # 「日付」昇順（空は最後）
-    tmp = pd.to_datetime(combined['日付'], errors='coerce')
-    combined = combined.assign(_d=tmp).sort_values(by=['_d']).drop(columns=['_d'])
-
-    # 出力列の最終順
-    combined = combined.reindex(columns=[c for c in COLS_OUT_ORDER if c in combined.columns])
-
-    return loan, cancel, combined
-
-def _parse_time_like(s: pd.Series) -> pd.Series:
-    """
-    'HH:MM' 'H:MM' 'HH:MM:SS' などの時間文字列を秒へ。
-    数値やNaNは安全にNaNへ。
-    """
-    if s is None:
-        return pd.Series(dtype='float64')
-    ss = s.fillna('')
-    def tosec(x):
-        t = str(x).strip()
-        if not t:
-            return np.nan
-        # 9:30 / 09:30 / 09:30:15 など
-        parts = t.split(':')
-        try:
-            h = int(parts[0])
-            m = int(parts[1]) if len(parts) > 1 else 0
-            sec = int(parts[2]) if len(parts) > 2 else 0
-            return h*3600 + m*60 + sec
-        except Exception:
-            return np.nan
-    return ss.map(tosec).astype('float64')
-
-def _sort_for_date_sheet(df_date: pd.DataFrame) -> pd.DataFrame:
-    """
-    日付シートの並べ替え規則:
-      1) 識別: 降順
-      2) 担当: 指定順（未掲載は最後）
-      3) 時間: 昇順
-    """
-    # 識別: 文字列の降順（必要あればカスタム順に変更可）
-    key1 = df_date['識別'].astype(str)
-
-    # 担当: カスタム順（未リストは大きな値）
-    order = {name: i for i, name in enumerate(担当順)}
-    key2 = df_date['担当'].astype(str).map(order).fillna(9999).astype(int)
-
-    # 時間: 可能な限り数値（秒）にパース
-    key3 = _parse_time_like(df_date['時間'])
-
-    df_sorted = df_date.assign(_k1=key1, _k2=key2, _k3=key3)\
-                       .sort_values(by=['_k1','_k2','_k3'], ascending=[True, True, True])\
-                       .drop(columns=['_k1','_k2','_k3'])
-    return df_sorted
-
-def _write_excel(out_path: Path, loan: pd.DataFrame, cancel: pd.DataFrame, combined: pd.DataFrame):
-    # まずpandasで出力
-    with pd.ExcelWriter(out_path, engine='openpyxl') as writer:
-        loan.to_excel(writer, sheet_name='sorted_by_融資実行日', index=False)
-        cancel.to_excel(writer, sheet_name='sorted_by_金消日・面談日', index=False)
-        combined.to_excel(writer, sheet_name='統合データ', index=False)
-
-        # 日付ごとのシート
-        if '日付' in combined.columns:
-            for date in combined['日付'].dropna().unique():
-                df_date = combined[combined['日付'] == date].copy()
-                df_date = _sort_for_date_sheet(df_date)
-                sheet = str(date).replace('/','-')
-                df_date.to_excel(writer, sheet_name=sheet, index=False)
-
-    # ここから openpyxl で書式を整える
-    from openpyxl import load_workbook
-    from openpyxl.styles import Border, Side, Alignment, Font
-
-    wb = load_workbook(out_path)
-
-    # 共通スタイル
-    dotted = Side(style='dotted')
-    border_all = Border(left=dotted, right=dotted, top=dotted, bottom=dotted)
-    align = Alignment(horizontal='center', vertical='center', shrink_to_fit=True, wrap_text=False)
-    header_font = Font(bold=True)
-
-    for ws in wb.worksheets:
-        # 全体セル範囲
-        max_row = ws.max_row
-        max_col = ws.max_column
-
-        # ヘッダ行を少し強調 & 高さ
-        ws.row_dimensions[1].height = ROW_HEIGHT
-
-        # 罫線・配置・高さ
-        for r in range(1, max_row+1):
-            ws.row_dimensions[r].height = ROW_HEIGHT
-            for c in range(1, max_col+1):
-                cell = ws.cell(row=r, column=c)
-                cell.border = border_all
-                # ヘッダは太字
-                if r == 1:
-                    cell.font = header_font
-                    # ヘッダは中央にしつつ shrink_to_fit
-                    cell.alignment = align
-                else:
-                    cell.alignment = align
-
-        # 列幅設定
-        header_names = [ws.cell(row=1, column=c).value for c in range(1, max_col+1)]
-        for idx, name in enumerate(header_names, start=1):
-            if name in WIDTH_RULES:
-                width = WIDTH_RULES[name]
-            else:
-                width = DEFAULT_WIDTH
-            ws.column_dimensions[chr(64+idx) if idx<=26 else None].width = width  # simple A-Z
-
-        # 万一26列を超える場合の安全対策
-        for c in range(1, max_col+1):
-            col_letter = ws.cell(row=1, column=c).column_letter
-            name = ws.cell(row=1, column=c).value
-            width = WIDTH_RULES.get(name, DEFAULT_WIDTH)
-            ws.column_dimensions[col_letter].width = width
-
-    wb.save(out_path)
-
-def sort_excel(input_path: str, output_path: str = 'sorted_combined.xlsx'):
-    src = Path(input_path)
-    if not src.exists():
-        raise FileNotFoundError(f'入力ファイルが見つかりません: {src}')
-    df = _read_sheet(src)
-    loan, cancel, combined = _make_tables(df)
-    _write_excel(Path(output_path), loan, cancel, combined)
-    return str(Path(output_path).resolve())
-
-def main():
-    try:
-        if len(sys.argv) < 2:
-            _show_msg("使い方", "処理したいExcelファイルを本実行ファイル (sort_excel.exe) にドラッグ/ドロップして実行してください。", 64)
-            sys.exit(0)
-        input_file = sys.argv[1]
-        out = sort_excel(input_file)
-        _show_msg("完了", f"処理が正常に完了しました。\n\n出力ファイル: {out}", 64)
-    except Exception as e:
-        import traceback
-        err_detail = traceback.format_exc()
-        _show_msg("エラー", f"処理中にエラーが発生しました:\n\n{e}\n\n詳細:\n{err_detail}", 16)
-        sys.exit(1)
-
-if __name__ == '__main__':
-    main()
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sort_excel.py (improved)
+- Excelの「受諾確認票」シートを読み込み、3種類のシートを生成
+  1) 融資実行日でソート
+  2) 金消日・面談日でソート
+  3) 上記を統合し、日付ごとの個別シートも自動作成
+- 「日付シート」では、以下の優先順位で並べ替え
+   (1) 識別: 降順
+   (2) 担当: 指定の順序（未リスト名は最後）
+   (3) 時間: 昇順
+- 罫線/高さ/配置/幅/縮小表示など表の書式を自動設定
+- PyInstallerでexe化できるよう、余計な依存を避けた実装
+"""
+
+import math
+import multiprocessing
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+from xml.sax.saxutils import escape
+import pandas as pd
+import numpy as np
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+# ====== 設定 ======
+担当順 = ["河内", "岩川", "杉田", "正木", "吉田", "中谷", "椙村", "北条", "上野"]
+# 担当の並び順（get_indexer で求めた位置をそのまま並べ替えキーに使う）
+_TANTO_ORDER = pd.Index(担当順)
+
+# Excelの列見出し（標準化後）
+COLS_LOAN   = ['融資実行日','形態','お客様氏名','物件','依頼内容','担当','管轄','立会時間','立会場所','立会者','当日申請']
+COLS_CANCEL = ['金消日・面談日','形態','お客様氏名','物件','依頼内容','担当','管轄','金消時間','金消場所・面談場所','意思確認','融資実行日']
+
+COLS_OUT_ORDER = ['日付','形態','お客様氏名','物件','依頼内容','担当','管轄','時間','場所','確認者','申請','識別']
+
+# 書式設定（列幅はだいたいのピクセル→Excel幅換算（約 1単位≒7px））
+PX = lambda p: round(p/7.0, 2)
+WIDTH_RULES = {
+    'お客様氏名': PX(115),
+    '物件': PX(160),
+    '場所': PX(160),
+    # その他は 80px
+}
+DEFAULT_WIDTH = PX(80)
+
+ROW_HEIGHT = 25  # pt ではなく「行の高さ」単位（ExcelのUI上）
+
+# 日付シートの合計行数がこれ以上なら、シートXMLの組み立てを複数プロセスで行う
+# （実測: 組み立て約40us/行、子プロセス起動約0.5秒 → 2プロセスでの損益分岐が約3.4万行）
+PARALLEL_MIN_ROWS = 50000
+# Windows の ProcessPoolExecutor は 61 プロセスまで
+_MAX_WORKERS = 61
+
+# 共通スタイル（styles.xml の cellXfs の番号）
+#   罫線: 点線 / 配置: 上下左右中央・縮小して全体を表示
+XF_BODY, XF_HEADER, XF_DATETIME, XF_DATE, XF_TIME = 1, 2, 3, 4, 5
+# ==================
+
+import ctypes
+
+# ====== xlsx 出力用の XML 部品 ======
+_NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_CT_SHEET = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+_REL_SHEET = _NS_REL + '/worksheet'
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
+    '<sheets>{sheets}</sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    f'<Relationship Id="rId{{styles_id}}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+_XF = ('<xf numFmtId="{fmt}" fontId="{font}" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" '
+       'applyAlignment="1"{apply_fmt}><alignment horizontal="center" vertical="center" shrinkToFit="1"/></xf>')
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{_NS_MAIN}">'
+    '<numFmts count="3">'
+    '<numFmt numFmtId="164" formatCode="yyyy-mm-dd h:mm:ss"/>'
+    '<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/>'
+    '<numFmt numFmtId="166" formatCode="h:mm:ss"/>'
+    '</numFmts>'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="dotted"/><right style="dotted"/><top style="dotted"/><bottom style="dotted"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="6">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    + _XF.format(fmt=0, font=0, apply_fmt='')                        # XF_BODY
+    + _XF.format(fmt=0, font=1, apply_fmt='')                        # XF_HEADER
+    + _XF.format(fmt=164, font=0, apply_fmt=' applyNumberFormat="1"')  # XF_DATETIME
+    + _XF.format(fmt=165, font=0, apply_fmt=' applyNumberFormat="1"')  # XF_DATE
+    + _XF.format(fmt=166, font=0, apply_fmt=' applyNumberFormat="1"')  # XF_TIME
+    + '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+_ILLEGAL_XML_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def _show_msg(title: str, text: str, style: int = 0):
+    try:
+        ctypes.windll.user32.MessageBoxW(0, text, title, style)
+    except Exception:
+        print(f"[{title}] {text}")
+
+def _make_header(values) -> list[str]:
+    """
+    見出し行を列名へ。pd.read_excel と同様に、空欄は 'Unnamed: N'、
+    重複は '担当', '担当.1', ... のように名前を付け直す。
+    """
+    header = []
+    counts = {}
+    for i, h in enumerate(values):
+        name = '' if h is None else str(h).strip()
+        if not name:
+            name = f'Unnamed: {i}'
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f'{name}.{count}'
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        header.append(name)
+    return header
+
+def _read_sheet(path: str) -> pd.DataFrame:
+    # read-only + data_only でセルオブジェクトを作らずに行を流し読みする
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = wb.sheetnames
+
+        target_sheet = None
+        candidates = ['受諾確認票', 'Sheet1', 'シート1']
+        for candidate in candidates:
+            if candidate in sheets:
+                target_sheet = candidate
+                break
+
+        if target_sheet is None and len(sheets) > 0:
+            target_sheet = sheets[0]
+
+        ws = wb[target_sheet]
+        # 保存元によっては dimension 情報が不正確なので再計算させる
+        ws.reset_dimensions()
+        rows = ws.values
+        header = _make_header(next(rows, ()))
+        # 各行は最後に値のあるセルまでしか返らないので、ヘッダの列数にそろえる
+        n = len(header)
+        data = [tuple(r[:n]) + (None,) * (n - len(r)) for r in rows]
+        # 末尾の空行だけ除く（pd.read_excel と同じく途中の空行は残す）
+        while data and all(v is None for v in data[-1]):
+            data.pop()
+    finally:
+        wb.close()
+
+    df = pd.DataFrame(data, columns=header)
+    # 日付系
+    for c in ['融資実行日','金消日・面談日']:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors='coerce')
+    return df
+
+def _dt_to_str(s: pd.Series) -> pd.Series:
+    # NaTはそのまま
+    return s.dt.strftime('%Y/%m/%d')
+
+def _with_date_str(df: pd.DataFrame) -> pd.DataFrame:
+    # 出力直前に「日付」を 'YYYY/MM/DD' 文字列へ
+    if '日付' in df.columns and pd.api.types.is_datetime64_any_dtype(df['日付']):
+        return df.assign(日付=_dt_to_str(df['日付']))
+    return df
+
+def _make_tables(df: pd.DataFrame):
+    # (1) 融資実行日でソート
+    loan = df.rename(columns={'融資実行日':'日付','立会時間':'時間','立会場所':'場所','立会者':'確認者','当日申請':'申請'})
+    # 列整列（必要な列だけを取り出すので全体のコピーは作らない）
+    loan = loan[[c for c in COLS_OUT_ORDER if c in loan.columns]]
+    loan['識別'] = '融資実行日'
+    loan = loan.sort_values(by='日付')
+
+    # (2) 金消日・面談日でソート
+    cancel = df.rename(columns={'金消日・面談日':'日付','金消時間':'時間','金消場所・面談場所':'場所','意思確認':'確認者','融資実行日':'申請'})
+    cancel = cancel[[c for c in COLS_OUT_ORDER if c in cancel.columns]]
+    cancel['識別'] = '金消日・面談日'
+    cancel = cancel.sort_values(by='日付')
+
+    # (3) 統合 + 「日付」昇順
+    combined = pd.concat([loan, cancel], ignore_index=True, sort=False)
+    # 日付シートは暦日単位なので時刻は落としておく（時刻付きの日付が別シートにならないように）
+    combined['日付'] = combined['日付'].dt.normalize()
+    # 「日付」昇順（空は最後）。日付は datetime のまま持ち、文字列化は出力時に行う
+    combined = combined.iloc[np.argsort(combined['日付'].to_numpy(), kind='stable')]
+
+    # 出力列の最終順
+    combined = combined.reindex(columns=[c for c in COLS_OUT_ORDER if c in combined.columns])
+
+    return loan, cancel, combined
+
+def _time_to_sec(x) -> float:
+    t = str(x).strip()
+    if not t:
+        return np.nan
+    # 9:30 / 09:30 / 09:30:15 など
+    parts = t.split(':')
+    try:
+        h = int(parts[0])
+        m = int(parts[1]) if len(parts) > 1 else 0
+        sec = int(parts[2]) if len(parts) > 2 else 0
+        return h*3600 + m*60 + sec
+    except Exception:
+        return np.nan
+
+def _parse_time_like(s: pd.Series) -> pd.Series:
+    """
+    'HH:MM' 'H:MM' 'HH:MM:SS' などの時間文字列を秒へ。
+    数値やNaNは安全にNaNへ。
+    時間の値は種類が少ないので、重複を除いた値だけを解釈して全体へ展開する。
+    """
+    if s is None:
+        return pd.Series(dtype='float64')
+    codes, uniques = pd.factorize(s)
+    # 末尾の NaN は欠損（コード -1）用
+    secs = np.array([_time_to_sec(u) for u in uniques] + [np.nan], dtype='float64')
+    return pd.Series(secs[codes], index=s.index)
+
+def _sort_for_date_sheets(df: pd.DataFrame):
+    """
+    日付シートの並べ替え規則（日付ごとに分割する前に全体を一度だけ並べ替える）:
+      0) 日付: 昇順（日付ごとのまとまり）
+      1) 識別: 降順
+      2) 担当: 指定順（未掲載は最後）
+      3) 時間: 昇順
+    並べ替えた表と、その各行の日付コード（日付なしは -1）・日付の一覧を返す。
+    """
+    # 日付: 昇順（空は最後）
+    codes, dates = pd.factorize(df['日付'], sort=True)
+    key0 = np.where(codes < 0, np.iinfo(codes.dtype).max, codes)
+
+    # 識別: 文字列の降順（必要あればカスタム順に変更可）
+    key1, _ = pd.factorize(df['識別'].astype(str), sort=True)
+
+    # 担当: カスタム順（未リストは大きな値）
+    # （未掲載名は -1）
+    key2 = _TANTO_ORDER.get_indexer(df['担当'])
+    key2 = np.where(key2 < 0, 9999, key2)
+
+    # 時間: 可能な限り数値（秒）にパース
+    key3 = _parse_time_like(df['時間']).to_numpy()
+
+    # lexsort は最後のキーが第1キー
+    perm = np.lexsort((key3, key2, key1, key0))
+    return df.iloc[perm], codes[perm], dates
+
+def _xml_text(v) -> str:
+    return escape(_ILLEGAL_XML_RE.sub('', str(v)), {'"': '&quot;'})
+
+def _cell_xml(ref: str, v, style: int = XF_BODY) -> str:
+    # NaN/NaT/None は書式だけの空セル
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(v, (bool, np.bool_)):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(v)}</v></c>'
+    if isinstance(v, (int, float, np.integer, np.floating)):
+        if not math.isfinite(v):
+            return f'<c r="{ref}" s="{style}"/>'
+        num = repr(float(v)) if isinstance(v, (float, np.floating)) else str(int(v))
+        return f'<c r="{ref}" s="{style}"><v>{num}</v></c>'
+    # 日付・時刻は Excel のシリアル値 + 表示形式
+    if isinstance(v, datetime):
+        serial = (pd.Timestamp(v).tz_localize(None) - _EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return f'<c r="{ref}" s="{XF_DATETIME}"><v>{serial!r}</v></c>'
+    if isinstance(v, date):
+        serial = (pd.Timestamp(v) - _EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return f'<c r="{ref}" s="{XF_DATE}"><v>{serial!r}</v></c>'
+    if isinstance(v, time):
+        serial = (v.hour*3600 + v.minute*60 + v.second + v.microsecond/1e6) / 86400
+        return f'<c r="{ref}" s="{XF_TIME}"><v>{serial!r}</v></c>'
+    text = _xml_text(v)
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+def _iter_sheet_xml(df: pd.DataFrame):
+    """
+    ワークシート XML を行単位の bytes で順に返す。
+    セルはすべてインライン文字列/数値（sharedStrings なし）。
+    """
+    names = [str(c) for c in df.columns]
+    letters = [get_column_letter(i) for i in range(1, len(names)+1)]
+
+    cols = ''.join(
+        f'<col min="{i}" max="{i}" width="{WIDTH_RULES.get(name, DEFAULT_WIDTH)}" customWidth="1"/>'
+        for i, name in enumerate(names, start=1)
+    )
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<worksheet xmlns="{_NS_MAIN}">'
+        f'<sheetFormatPr defaultRowHeight="{ROW_HEIGHT}" customHeight="1"/>'
+        + (f'<cols>{cols}</cols>' if cols else '') +
+        '<sheetData>'
+    ).encode('utf-8')
+
+    # ヘッダは太字
+    header = ''.join(_cell_xml(f'{l}1', name, XF_HEADER) for l, name in zip(letters, names))
+    yield f'<row r="1">{header}</row>'.encode('utf-8')
+
+    for r, values in enumerate(df.itertuples(index=False, name=None), start=2):
+        cells = ''.join(_cell_xml(f'{l}{r}', v) for l, v in zip(letters, values))
+        yield f'<row r="{r}">{cells}</row>'.encode('utf-8')
+
+    yield b'</sheetData></worksheet>'
+
+def _render_sheet_xml(df: pd.DataFrame) -> bytes:
+    # 別プロセスで組み立てるとき用（結果をまとめて返す）
+    return b''.join(_iter_sheet_xml(df))
+
+def _write_sheet_xml(zf: zipfile.ZipFile, sheet_no: int, chunks):
+    # xl/worksheets/sheet{N}.xml をストリーム出力
+    with zf.open(f'xl/worksheets/sheet{sheet_no}.xml', 'w') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+def _make_sheets(loan: pd.DataFrame, cancel: pd.DataFrame, combined: pd.DataFrame):
+    """
+    出力するシート名と内容の一覧（出力順）を (通常シート, 日付シート) で返す。
+    「日付」はここで文字列化する。
+    """
+    sheets = [
+        ('sorted_by_融資実行日', _with_date_str(loan)),
+        ('sorted_by_金消日・面談日', _with_date_str(cancel)),
+        ('統合データ', _with_date_str(combined)),
+    ]
+    # 日付ごとのシート
+    date_sheets = []
+    if '日付' in combined.columns:
+        df_sorted, codes, dates = _sort_for_date_sheets(combined)
+        # 日付順に並んでいるので同じ日付の行は連続している → 境界で切り出すだけ
+        starts = np.flatnonzero(np.diff(codes, prepend=-2))
+        ends = np.append(starts[1:], len(codes))
+        for a, b in zip(starts, ends):
+            if codes[a] < 0:  # 日付なし
+                continue
+            date_sheets.append((dates[codes[a]].strftime('%Y-%m-%d'), _with_date_str(df_sorted.iloc[a:b])))
+    return sheets, date_sheets
+
+def _write_excel(out_path: str, sheets: list[tuple[str, pd.DataFrame]], *,
+                 date_sheets: list[tuple[str, pd.DataFrame]]):
+    names = [name for name, _ in sheets] + [name for name, _ in date_sheets]
+
+    # xlsx (zip) を直接組み立てる
+    with zipfile.ZipFile(out_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        # 通常シートは大きいので常にストリーム出力（シート全体をメモリに持たない）
+        for no, (_, df) in enumerate(sheets, start=1):
+            _write_sheet_xml(zf, no, _iter_sheet_xml(df))
+
+        # 日付シートは互いに独立なので、量が多いときは別プロセスで XML を組み立てる
+        # （プロセス起動のコストがあるため少量なら逐次）
+        start = len(sheets) + 1
+        frames = [df for _, df in date_sheets]
+        workers = min(len(frames), os.cpu_count() or 1, _MAX_WORKERS)
+        if workers > 1 and sum(len(df) for df in frames) >= PARALLEL_MIN_ROWS:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                for no, xml in enumerate(ex.map(_render_sheet_xml, frames), start=start):
+                    _write_sheet_xml(zf, no, (xml,))
+        else:
+            for no, df in enumerate(frames, start=start):
+                _write_sheet_xml(zf, no, _iter_sheet_xml(df))
+
+        overrides = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{no}.xml" ContentType="{_CT_SHEET}"/>'
+            for no in range(1, len(names)+1)
+        )
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES_XML.format(sheets=overrides))
+        zf.writestr('_rels/.rels', _ROOT_RELS_XML)
+        zf.writestr('xl/styles.xml', _STYLES_XML)
+        zf.writestr('xl/workbook.xml', _WORKBOOK_XML.format(sheets=''.join(
+            f'<sheet name="{_xml_text(name)}" sheetId="{no}" r:id="rId{no}"/>'
+            for no, name in enumerate(names, start=1)
+        )))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML.format(sheets=''.join(
+            f'<Relationship Id="rId{no}" Type="{_REL_SHEET}" Target="worksheets/sheet{no}.xml"/>'
+            for no in range(1, len(names)+1)
+        ), styles_id=len(names)+1))
+
+def sort_excel(input_path: str, output_path: str = 'sorted_combined.xlsx'):
+    try:
+        os.stat(input_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f'入力ファイルが見つかりません: {input_path}') from None
+    df = _read_sheet(input_path)
+    loan, cancel, combined = _make_tables(df)
+    sheets, date_sheets = _make_sheets(loan, cancel, combined)
+    _write_excel(output_path, sheets, date_sheets=date_sheets)
+    return os.path.abspath(output_path)
+
+def main():
+    # PyInstaller の exe から子プロセスを起動するために必要
+    multiprocessing.freeze_support()
+    try:
+        if len(sys.argv) < 2:
+            _show_msg("使い方", "処理したいExcelファイルを本実行ファイル (sort_excel.exe) にドラッグ/ドロップして実行してください。", 64)
+            sys.exit(0)
+        input_file = sys.argv[1]
+        out = sort_excel(input_file)
+        _show_msg("完了", f"処理が正常に完了しました。\n\n出力ファイル: {out}", 64)
+    except Exception as e:
+        import traceback
+        err_detail = traceback.format_exc()
+        _show_msg("エラー", f"処理中にエラーが発生しました:\n\n{e}\n\n詳細:\n{err_detail}", 16)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from sort_excel import (
+    DEFAULT_WIDTH, ROW_HEIGHT, WIDTH_RULES,
+    _make_header, _parse_time_like, _read_sheet, _write_excel, sort_excel,
+)
+
+
+def _tosec_reference(x):
+    # 旧実装（1要素ずつ int() で解釈していた tosec）
+    t = str(x).strip()
+    if not t:
+        return np.nan
+    parts = t.split(':')
+    try:
+        h = int(parts[0])
+        m = int(parts[1]) if len(parts) > 1 else 0
+        sec = int(parts[2]) if len(parts) > 2 else 0
+        return h*3600 + m*60 + sec
+    except Exception:
+        return np.nan
+
+
+SAMPLES = [
+    '9:30', '09:30', '09:30:15', '9', '25:00', '1:75', '1:2:3:4',
+    ' 8:05 ', '9 : 30', '-1:30', '+2',
+    '９:３０', '１０：００',          # 全角
+    '9:', '', '午後', '9.5', '9:3a',
+    None, np.nan, 10, 9.0,
+    datetime.time(9, 30), pd.Timestamp('2024-01-02 09:30'),
+]
+
+
+@pytest.mark.parametrize('value', SAMPLES, ids=repr)
+def test_parse_time_like_matches_reference(value):
+    got = _parse_time_like(pd.Series([value], dtype=object)).iloc[0]
+    expected = _tosec_reference('' if value is None or value is np.nan else value)
+    if np.isnan(expected):
+        assert np.isnan(got)
+    else:
+        assert got == expected
+
+
+def test_parse_time_like_keeps_index_and_dtype():
+    s = pd.Series(['9:30', None, 'x'], index=[5, 3, 9], dtype=object)
+    out = _parse_time_like(s)
+    assert out.dtype == 'float64'
+    assert out.index.equals(s.index)
+    assert out.tolist()[0] == 34200
+
+
+HEADER = ['融資実行日','金消日・面談日','形態','お客様氏名','物件','依頼内容','担当','管轄',
+          '立会時間','立会場所','立会者','当日申請','金消時間','金消場所・面談場所','意思確認']
+
+
+def test_make_header_renames_blank_and_duplicate():
+    assert _make_header(['担当', None, ' 担当 ', '', '担当']) == \
+        ['担当', 'Unnamed: 1', '担当.1', 'Unnamed: 3', '担当.2']
+
+
+def test_read_sheet_with_duplicate_and_blank_header(tmp_path):
+    src = tmp_path / 'in.xlsx'
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Sheet1'
+    ws.append(HEADER + ['担当', None, 'メモ'])
+    ws.append(['2024-01-02', '2024-01-03', 'A', '客', '物件', 'x', '河内', 1,
+               '9:30', 'p', 'q', None, '10:00', 'r', 's', '岩川', 'n', 'm'])
+    wb.save(src)
+
+    df = _read_sheet(str(src))
+    assert list(df.columns) == HEADER + ['担当.1', 'Unnamed: 16', 'メモ']
+    assert df.loc[0, '担当'] == '河内'
+
+    # 重複見出しがあっても最後まで処理できる
+    sort_excel(str(src), str(tmp_path / 'out.xlsx'))
+
+
+def test_write_excel_roundtrip(tmp_path):
+    out = tmp_path / 'out.xlsx'
+    df = pd.DataFrame({
+        'お客様氏名': ['<&>"山田"', 'a\x01b', ' 前後 ', None],
+        '物件': [1, 2.5, np.nan, float('inf')],
+        '識別': [True, False, None, 'x'],
+        '申請': [pd.Timestamp('2024-01-02 03:04:05'), datetime.date(2024, 1, 2),
+                 datetime.time(9, 30), pd.NaT],
+    }, dtype=object)
+    _write_excel(str(out), [('sorted_by_融資実行日', df)], date_sheets=[('2024-01-02', df.iloc[:1])])
+
+    wb = load_workbook(out)
+    assert wb.sheetnames == ['sorted_by_融資実行日', '2024-01-02']
+    ws = wb['sorted_by_融資実行日']
+
+    rows = [[c.value for c in row] for row in ws.iter_rows()]
+    assert rows == [
+        ['お客様氏名', '物件', '識別', '申請'],
+        ['<&>"山田"', 1, True, datetime.datetime(2024, 1, 2, 3, 4, 5)],
+        ['ab', 2.5, False, datetime.datetime(2024, 1, 2)],    # 制御文字は除去
+        [' 前後 ', None, None, datetime.time(9, 30)],
+        [None, None, 'x', None],                              # NaN/inf/NaT は空セル
+    ]
+    assert [ws[ref].number_format for ref in ('D2', 'D3', 'D4')] == \
+        ['yyyy-mm-dd h:mm:ss', 'yyyy-mm-dd', 'h:mm:ss']
+
+    # 列幅・行の高さ
+    assert ws.column_dimensions['A'].width == WIDTH_RULES['お客様氏名']
+    assert ws.column_dimensions['B'].width == WIDTH_RULES['物件']
+    assert ws.column_dimensions['C'].width == DEFAULT_WIDTH
+    assert ws.sheet_format.defaultRowHeight == ROW_HEIGHT
+
+    # 書式: 全セル点線罫線・中央揃え・縮小表示、ヘッダのみ太字
+    for row in ws.iter_rows():
+        for cell in row:
+            assert {cell.border.left.style, cell.border.right.style,
+                    cell.border.top.style, cell.border.bottom.style} == {'dotted'}
+            assert cell.alignment.horizontal == 'center'
+            assert cell.alignment.vertical == 'center'
+            assert cell.alignment.shrink_to_fit
+            assert bool(cell.font.b) == (cell.row == 1)